@@ -1,8 +1,99 @@
+from functools import lru_cache
 from numpy import pi
-from scipy.fftpack import fft, ifft
+from scipy.fft import rfft, irfft
 import numpy as np
 
-np.seterr(over='raise', invalid='raise')
+try:
+    import numba
+    import rocket_fft # noqa: F401, provides np.fft inside numba-compiled code
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+try:
+    import pyfftw
+    HAVE_FFTW = True
+except ImportError:
+    HAVE_FFTW = False
+
+# fastmath flags for the compiled kernels.  'nnan'/'ninf' are left out so that
+# blow-ups can still be detected, and so is 'reassoc', which together with
+# 'nsz' lets LLVM fold the finiteness test away (there are no reductions to
+# gain from it anyway); 'contract' is what gives the FMAs.
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn'}
+
+
+@lru_cache(maxsize=16)
+def _fftw_plans(N, dtype):
+    #
+    # FFTW irfft/rfft plans of length N for real arrays of the given dtype,
+    # planned once and shared by every KS instance of that size and precision.
+    # The plans return their own output buffers, so results must be used
+    # (or copied) before the next call.
+    real = pyfftw.empty_aligned(N, dtype=dtype)
+    cplx = pyfftw.empty_aligned(N//2+1, dtype=np.result_type(dtype, np.complex64))
+    inv  = pyfftw.builders.irfft(cplx, n=N, planner_effort='FFTW_PATIENT', threads=1)
+    fwd  = pyfftw.builders.rfft(real, planner_effort='FFTW_PATIENT', threads=1)
+    return inv, fwd
+
+
+if HAVE_NUMBA:
+    @numba.njit(cache=True, fastmath=_FASTMATH)
+    def _etdrk4_step(v, a, b, c, E, E2, Q, f1, f2, f3, g, N):
+        #
+        # One ETDRK4 step of KS on the half spectrum, same scheme as
+        # KS.step_numpy.  v is advanced in place, a, b, c are caller-owned
+        # stage buffers; returns False if the new state is not finite (the
+        # flag is fused into the last loop).
+        Nf  = v.size
+        two = np.float32(2.)
+        #
+        u = np.fft.irfft(v, N); u *= u; Nv = np.fft.rfft(u)
+        for i in range(Nf):
+            Nv[i] *= g[i]
+            b[i]   = E2[i]*v[i]        # E2*v, shared by a and b
+            a[i]   = b[i] + Q[i]*Nv[i]
+        u = np.fft.irfft(a, N); u *= u; Na = np.fft.rfft(u)
+        for i in range(Nf):
+            Na[i] *= g[i]
+            b[i]  += Q[i]*Na[i]
+        u = np.fft.irfft(b, N); u *= u; Nb = np.fft.rfft(u)
+        for i in range(Nf):
+            Nb[i] *= g[i]
+            c[i]   = E2[i]*a[i] + Q[i]*(two*Nb[i] - Nv[i])
+        u = np.fft.irfft(c, N); u *= u; Nc = np.fft.rfft(u)
+        #
+        finite = True
+        for i in range(Nf):
+            v[i] = E[i]*v[i] + Nv[i]*f1[i] + two*(Na[i] + Nb[i])*f2[i] + g[i]*Nc[i]*f3[i]
+            finite &= np.isfinite(v[i].real) & np.isfinite(v[i].imag)
+        return finite
+
+
+    @numba.njit(cache=True, fastmath=_FASTMATH)
+    def _simulate_kernel(v, vv, tt, a, b, c, E, E2, Q, f1, f2, f3, g, N, t, dt, nsteps, iout, ioutnum, corrected, correction):
+        #
+        # Time loop of KS.simulate: advance v by nsteps steps (adding
+        # correction after each one if corrected), storing every iout-th
+        # state in vv/tt after row ioutnum.
+        # Returns (steps taken, ioutnum, t, finite).
+        nextout = iout if iout > 0 else nsteps+1 # next step to store
+        for n in range(1, nsteps+1):
+            if not _etdrk4_step(v, a, b, c, E, E2, Q, f1, f2, f3, g, N):
+                return n-1, ioutnum, t, False
+            if corrected:
+                for i in range(v.size):
+                    v[i] += correction[i]
+            t += dt
+            if n == nextout:
+                # rows of vv are contiguous, so this is one Nf-long copy
+                # straight into the preallocated output (no staging buffer)
+                nextout += iout
+                ioutnum += 1
+                vv[ioutnum,:] = v
+                tt[ioutnum]   = t
+        return nsteps, ioutnum, t, True
+
 
 class KS:
     #
@@ -20,9 +111,10 @@ class KS:
     # Temporal discretization: exponential time differencing fourth-order Runge-Kutta
     # see AK Kassam and LN Trefethen, SISC 2005
 
-    def __init__(self, L=16, N=128, dt=0.25, nsteps=None, tend=150, iout=1):
+    def __init__(self, L=16, N=128, dt=0.25, nsteps=None, tend=150, iout=1, jit=True):
         #
         # Initialize
+        # (jit: use the numba-compiled kernels if numba and rocket-fft are installed)
         L  = float(L); dt = float(dt); tend = float(tend)
         if (nsteps is None):
             nsteps = int(tend/dt)
@@ -34,11 +126,13 @@ class KS:
         # save to self
         self.L = L
         self.N = N
+        self.Nf = N//2 + 1 # no. of stored Fourier modes (u is real: half spectrum)
         self.dx = 2*pi*L/N
         self.dt = dt
         self.nsteps = nsteps
         self.iout = iout
         self.nout = int(nsteps/iout)
+        self.jit  = bool(jit) and HAVE_NUMBA
         #
         # set initial condition
         self.IC()
@@ -51,13 +145,17 @@ class KS:
         #
         # precompute ETDRK4 scalar quantities:
         self.setup_etdrk4()
+        #
+        # preallocate work arrays for step
+        self.setup_workspace()
 
 
     def setup_timeseries(self, nout=None):
         if (nout != None):
             self.nout = int(nout)
         # nout+1 so we store the IC as well
-        self.vv = np.zeros([self.nout+1, self.N], dtype=np.complex64)
+        # (same dtype as the state, so snapshots are plain copies)
+        self.vv = np.zeros([self.nout+1, self.Nf], dtype=self.v.dtype)
         self.tt = np.zeros(self.nout+1)
         #
         # store the IC in [0]
@@ -67,18 +165,19 @@ class KS:
 
     def setup_fourier(self, coeffs=None):
         self.x  = 2*pi*self.L*np.r_[0:self.N]/self.N
-        self.k  = np.r_[0:self.N/2, 0, -self.N/2+1:0]/self.L # Wave numbers
+        self.k  = np.r_[0:self.N/2, 0]/self.L # Wave numbers (non-negative half)
         # Fourier multipliers for the linear term Lu
         if (coeffs is None):
             # normal-form equation
             self.l = self.k**2 - self.k**4
         else:
             # altered-coefficients 
-            self.l = -      coeffs[0]*np.ones(self.k.shape) \
-                     -      coeffs[1]*1j*self.k             \
+            self.l = -      coeffs[0]                       \
                      + (1 + coeffs[2])  *self.k**2          \
-                     +      coeffs[3]*1j*self.k**3          \
                      - (1 + coeffs[4])  *self.k**4
+            # the odd derivatives make l complex, only promote if present
+            if (coeffs[1] != 0) or (coeffs[3] != 0):
+                self.l = self.l - coeffs[1]*1j*self.k + coeffs[3]*1j*self.k**3
 
 
     def setup_etdrk4(self):
@@ -86,12 +185,55 @@ class KS:
         self.E2 = np.exp(self.dt*self.l/2.)
         self.M  = 16                                           # no. of points for complex means
         self.r  = np.exp(1j*pi*(np.r_[1:self.M+1]-0.5)/self.M) # roots of unity
-        self.LR = self.dt*np.repeat(self.l[:,np.newaxis], self.M, axis=1) + np.repeat(self.r[np.newaxis,:], self.N, axis=0)
-        self.Q  = self.dt*np.real(np.mean((np.exp(self.LR/2.) - 1.)/self.LR, 1))
-        self.f1 = self.dt*np.real( np.mean( (-4. -    self.LR              + np.exp(self.LR)*( 4. - 3.*self.LR + self.LR**2) )/(self.LR**3) , 1) )
-        self.f2 = self.dt*np.real( np.mean( ( 2. +    self.LR              + np.exp(self.LR)*(-2. +    self.LR             ) )/(self.LR**3) , 1) )
-        self.f3 = self.dt*np.real( np.mean( (-4. - 3.*self.LR - self.LR**2 + np.exp(self.LR)*( 4. -    self.LR             ) )/(self.LR**3) , 1) )
+        self.LR = self.dt*self.l[:,np.newaxis] + self.r[np.newaxis,:]  # broadcast, no repeated copies
+        # means over the M roots, accumulated one root at a time so that only
+        # a few Nf-long temporaries are live instead of the Nf x M ones
+        self.Q  = np.zeros(self.Nf); self.f1 = np.zeros(self.Nf)
+        self.f2 = np.zeros(self.Nf); self.f3 = np.zeros(self.Nf)
+        for j in range(self.M):
+            lr  = self.LR[:,j]
+            elr = np.exp(lr)
+            lr3 = lr**3
+            self.Q  += ((np.exp(lr/2.) - 1.)/lr).real
+            self.f1 += ( (-4. -    lr         + elr*( 4. - 3.*lr + lr**2) )/lr3 ).real
+            self.f2 += ( ( 2. +    lr         + elr*(-2. +    lr        ) )/lr3 ).real
+            self.f3 += ( (-4. - 3.*lr - lr**2 + elr*( 4. -    lr        ) )/lr3 ).real
+        self.Q  *= self.dt/self.M; self.f1 *= self.dt/self.M
+        self.f2 *= self.dt/self.M; self.f3 *= self.dt/self.M
         self.g  = -0.5j*self.k
+        #
+        # The coefficients are computed in double precision above; the time
+        # stepping itself runs in single precision.  They are packed as rows
+        # of two contiguous blocks, float32 for the real ones and complex64
+        # for the complex ones (g, and E, E2 if l is complex), and self.E etc.
+        # become views on those rows.
+        names = ('E', 'E2', 'Q', 'f1', 'f2', 'f3', 'g')
+        rnames = [n for n in names if not np.iscomplexobj(getattr(self, n))]
+        cnames = [n for n in names if     np.iscomplexobj(getattr(self, n))]
+        self._rcoeffs = np.empty((len(rnames), self.Nf), dtype=np.float32)
+        self._ccoeffs = np.empty((len(cnames), self.Nf), dtype=np.complex64)
+        for block, bnames in ((self._rcoeffs, rnames), (self._ccoeffs, cnames)):
+            for i, n in enumerate(bnames):
+                block[i] = getattr(self, n)
+                setattr(self, n, block[i])
+
+
+    def setup_workspace(self):
+        #
+        # Persistent buffers reused by step, so that the time loop does not
+        # allocate fresh N-long arrays at every stage
+        self._a  = np.empty(self.Nf, dtype=np.complex64)
+        self._b  = np.empty(self.Nf, dtype=np.complex64)
+        self._c  = np.empty(self.Nf, dtype=np.complex64)
+        self._Nv = np.empty(self.Nf, dtype=np.complex64)
+        self._Na = np.empty(self.Nf, dtype=np.complex64)
+        self._Nb = np.empty(self.Nf, dtype=np.complex64)
+        self._Nc = np.empty(self.Nf, dtype=np.complex64)
+        self._tmp = np.empty(self.Nf, dtype=np.complex64)
+        #
+        # shared FFTW plans for step_numpy, scipy.fft is used without pyfftw
+        # (the compiled path never calls them, so they are not planned then)
+        self._plans = _fftw_plans(self.N, np.float32) if (HAVE_FFTW and not self.jit) else None
 
 
     def IC(self, u0=None, v0=None, testing=False):
@@ -116,40 +258,87 @@ class KS:
                     # if ok cast to np.array
                     u0 = np.array(u0)
             # in any case, set v0:
-            v0 = fft(u0)
+            v0 = rfft(u0)
         else:
             # the initial condition is provided in v0
             # check the input size
-            if (np.size(v0,0) != self.N):
+            if (np.size(v0,0) != self.Nf):
                 print('Error: wrong IC array size')
                 return -1
             else:
                 # if ok cast to np.array
                 v0 = np.array(v0)
                 # and transform to physical space
-                u0 = ifft(v0)
+                u0 = irfft(v0, n=self.N)
         #
         # and save to self
         self.u0  = u0
         self.v0  = v0
-        self.v   = v0
+        self.v   = np.array(v0, dtype=np.complex64) # own copy, step works in place
         self.t   = 0.
         self.stepnum = 0
         self.ioutnum = 0 # [0] is the initial condition
         
 
+    def nonlinear(self, x, out):
+        #
+        # Nonlinear term g*rfft(irfft(x)**2), written into out.
+        # Transforms run along the last axis, so a stack of states with the
+        # batch along axis 0 goes through a single FFT call.
+        # With pyfftw the shared FFTW plans are used for single states (they
+        # are planned for one length-N transform, stacks still go to scipy).
+        # irfft output is real already, so it is squared in place.
+        if (self._plans is None) or (np.ndim(x) > 1):
+            ui = irfft(x, n=self.N, axis=-1)
+            np.square(ui, out=ui)
+            np.multiply(self.g, rfft(ui, axis=-1, overwrite_x=True), out=out)
+        else:
+            inv, fwd = self._plans
+            ui = inv(x)
+            np.square(ui, out=ui)
+            np.multiply(self.g, fwd(ui), out=out)
+
+
     def step(self):
         #
-        # Computation is based on v = fft(u), so linear term is diagonal.
+        # Advance one time step, with the compiled kernel when available
+        # (blow-ups are not trapped here, simulate checks for them)
+        if self.jit:
+            _etdrk4_step(self.v, self._a, self._b, self._c,
+                         self.E, self.E2, self.Q, self.f1, self.f2, self.f3, self.g, self.N)
+            self.stepnum += 1
+            self.t       += self.dt
+        else:
+            self.step_numpy()
+
+
+    def step_numpy(self):
+        #
+        # Computation is based on v = rfft(u), so linear term is diagonal.
+        # Only the non-negative half of the spectrum is kept, since u is real.
         # The time-discretization is done via ETDRK4
         # (exponential time differencing - 4th order Runge Kutta)
         #
-        v = self.v;                           Nv = self.g*fft(np.real(ifft(v))**2)
-        a = self.E2*v + self.Q*Nv;            Na = self.g*fft(np.real(ifft(a))**2)
-        b = self.E2*v + self.Q*Na;            Nb = self.g*fft(np.real(ifft(b))**2)
-        c = self.E2*a + self.Q*(2.*Nb - Nv);  Nc = self.g*fft(np.real(ifft(c))**2)
+        v   = self.v
+        tmp = self._tmp
+        a,  b,  c  = self._a,  self._b,  self._c
+        Nv, Na, Nb, Nc = self._Nv, self._Na, self._Nb, self._Nc
         #
-        self.v = self.E*v + Nv*self.f1 + 2.*(Na + Nb)*self.f2 + Nc*self.f3
+        self.nonlinear(v, Nv)
+        np.multiply(self.E2, v, out=b) # E2*v, shared by a and b
+        np.multiply(self.Q, Nv, out=a); a += b
+        self.nonlinear(a, Na)
+        np.multiply(self.Q, Na, out=tmp); b += tmp
+        self.nonlinear(b, Nb)
+        np.multiply(2., Nb, out=tmp); tmp -= Nv; tmp *= self.Q
+        np.multiply(self.E2, a, out=c); c += tmp
+        self.nonlinear(c, Nc)
+        #
+        # v = E*v + Nv*f1 + 2*(Na + Nb)*f2 + Nc*f3, in place through tmp
+        v *= self.E
+        np.multiply(Nv, self.f1, out=tmp); v += tmp
+        np.add(Na, Nb, out=tmp); tmp *= self.f2; tmp *= 2.; v += tmp
+        np.multiply(Nc, self.f3, out=tmp); v += tmp
         self.stepnum += 1
         self.t       += self.dt
 
@@ -175,49 +364,198 @@ class KS:
             self.setup_timeseries(nout=self.nout)
         #
         # advance in time for nsteps steps
-        if (correction==[]):
-            for n in range(1,self.nsteps+1):
-                try:
-                    self.step()
-                except FloatingPointError:
-                    #
-                    # something exploded
-                    # cut time series to last saved solution and return
-                    self.nout = self.ioutnum
-                    self.vv.resize((self.nout+1,self.N)) # nout+1 because the IC is in [0]
-                    self.tt.resize(self.nout+1)          # nout+1 because the IC is in [0]
-                    return -1
-                if ( (self.iout>0) and (n%self.iout==0) ):
-                    self.ioutnum += 1
-                    self.vv[self.ioutnum,:] = self.v
-                    self.tt[self.ioutnum]   = self.t
+        nextout = self.iout if self.iout > 0 else self.nsteps+1 # next step to store
+        if self.jit:
+            # numba does no bounds checking: refuse up front to store more
+            # snapshots than vv has rows, as indexing does in the loops below
+            if (self.iout > 0) and (self.ioutnum + self.nsteps//self.iout > self.vv.shape[0]-1):
+                raise IndexError('index %d is out of bounds for axis 0 with size %d'
+                                 % (self.vv.shape[0], self.vv.shape[0]))
+            corrected  = np.size(correction) > 0
+            correction = np.ascontiguousarray(np.broadcast_to(correction, self.v.shape) if corrected else self.v[:0], dtype=self.v.dtype)
+            nstepped, self.ioutnum, self.t, finite = _simulate_kernel(self.v, self.vv, self.tt,
+                self._a, self._b, self._c, self.E, self.E2, self.Q, self.f1, self.f2, self.f3, self.g, self.N,
+                self.t, self.dt, self.nsteps, self.iout, self.ioutnum, corrected, correction)
+            self.stepnum += nstepped
+            if not finite:
+                # something exploded
+                self.cut_timeseries()
+                return -1
         else:
-            # lots of code duplication here, but should improve speed instead of having the 'if correction' at every time step
-            for n in range(1,self.nsteps+1):
-                try:
-                    self.step()
-                    self.v += correction
-                except FloatingPointError:
-                    #
-                    # something exploded
-                    # cut time series to last saved solution and return
-                    self.nout = self.ioutnum
-                    self.vv.resize((self.nout+1,self.N)) # nout+1 because the IC is in [0]
-                    self.tt.resize(self.nout+1)          # nout+1 because the IC is in [0]
+            # overflows are detected by checking for a finite state at every
+            # output step and at the end, instead of trapping each operation.
+            # Loop invariants are hoisted to locals (step updates self.v in
+            # place, so v stays valid) and ioutnum is written back afterwards.
+            step    = self.step
+            v       = self.v
+            vv, tt  = self.vv, self.tt
+            iout    = self.iout
+            ioutnum = self.ioutnum
+            finite  = True
+            with np.errstate(over='ignore', invalid='ignore'):
+                if (np.size(correction) == 0):
+                    for n in range(1,self.nsteps+1):
+                        step()
+                        if (n == nextout):
+                            finite = np.isfinite(v).all()
+                            if not finite:
+                                break
+                            nextout += iout
+                            ioutnum += 1
+                            np.copyto(vv[ioutnum], v)
+                            tt[ioutnum] = self.t
+                else:
+                    # lots of code duplication here, but should improve speed instead of having the 'if correction' at every time step
+                    for n in range(1,self.nsteps+1):
+                        step()
+                        v += correction
+                        if (n == nextout):
+                            finite = np.isfinite(v).all()
+                            if not finite:
+                                break
+                            nextout += iout
+                            ioutnum += 1
+                            np.copyto(vv[ioutnum], v)
+                            tt[ioutnum] = self.t
+                self.ioutnum = ioutnum
+                if not (finite and np.isfinite(v).all()):
+                    # something exploded, possibly after the last saved solution
+                    self.cut_timeseries()
                     return -1
-                if ( (self.iout>0) and (n%self.iout==0) ):
-                    self.ioutnum += 1
-                    self.vv[self.ioutnum,:] = self.v
-                    self.tt[self.ioutnum]   = self.t
 
         self.fou2real()
 
 
+    def cut_timeseries(self):
+        #
+        # cut time series to last saved solution
+        # (views on the preallocated arrays, no reallocation)
+        self.nout = self.ioutnum
+        self.vv = self.vv[:self.nout+1] # nout+1 because the IC is in [0]
+        self.tt = self.tt[:self.nout+1] # nout+1 because the IC is in [0]
+
+
     def fou2real(self):
         #
         # Convert from spectral to physical space
-        self.uu = np.real(ifft(self.vv))
+        # (one batched transform over all snapshots, along the last axis).
+        # irfft of the half spectrum gives the real field directly, in the
+        # precision of vv; its output is the only (nout+1) x N allocation.
+        self.uu = irfft(self.vv, n=self.N, axis=-1, workers=-1)
+
+
+class KSEnsemble(KS):
+    #
+    # B independent KS trajectories of the same system, advanced together.
+    #
+    # The state v has shape (B, Nf) and every ETDRK4 coefficient (Nf,) is
+    # broadcast over the batch, so each sub-step is one batched FFT along the
+    # last axis instead of B separate ones.  Snapshots are stored time-major
+    # like in KS: vv[n] (and uu[n]) hold the whole batch at output n, so vv is
+    # (nout+1, B, Nf) and uu is (nout+1, B, N).
+    #
+    # With gpu=True the arrays live on the GPU through CuPy and the transforms
+    # go to cuFFT via cupyx.scipy.fft (whose plan cache keeps the batched
+    # plans); uu is returned on the host.  The numba kernels are
+    # single-trajectory, so the ensemble always uses step_numpy.
+
+    def __init__(self, B=32, L=16, N=128, dt=0.25, nsteps=None, tend=150, iout=1, gpu=False):
+        #
+        # array module and FFT backend, needed before KS sets the IC
+        self.B = int(B)
+        if gpu:
+            import cupy
+            import cupyx.scipy.fft
+            self.xp, self._fft = cupy, cupyx.scipy.fft
+        else:
+            import scipy.fft
+            self.xp, self._fft = np, scipy.fft
+        KS.__init__(self, L=L, N=N, dt=dt, nsteps=nsteps, tend=tend, iout=iout, jit=False)
+
 
+    def setup_timeseries(self, nout=None):
+        if (nout != None):
+            self.nout = int(nout)
+        # nout+1 so we store the IC as well
+        self.vv = self.xp.zeros([self.nout+1, self.B, self.Nf], dtype=self.v.dtype)
+        self.tt = np.zeros(self.nout+1)
+        #
+        # store the IC in [0]
+        self.vv[0] = self.v0
+        self.tt[0] = 0.
+
+
+    def setup_etdrk4(self):
+        #
+        # coefficients are computed on the host, then moved to the array module
+        KS.setup_etdrk4(self)
+        for n in ('E', 'E2', 'Q', 'f1', 'f2', 'f3', 'g'):
+            setattr(self, n, self.xp.asarray(getattr(self, n)))
+
+
+    def setup_workspace(self):
+        #
+        # Persistent (B, Nf) buffers reused by step_numpy
+        shape = (self.B, self.Nf)
+        self._a,  self._b,  self._c       = [self.xp.empty(shape, dtype=np.complex64) for i in range(3)]
+        self._Nv, self._Na, self._Nb, self._Nc = [self.xp.empty(shape, dtype=np.complex64) for i in range(4)]
+        self._tmp = self.xp.empty(shape, dtype=np.complex64)
+        self._plans = None
+
+
+    def IC(self, u0=None, v0=None, testing=False):
+        #
+        # Set initial condition for the whole batch.  u0 (v0) may be given
+        # either per trajectory, shape (B, N) ((B, Nf)), or once for all, (N,)
+        if (v0 is None):
+            if (u0 is None):
+                if testing:
+                    # template from AK Kassam and LN Trefethen, SISC 2005
+                    u0 = np.cos(self.x/self.L)*(1. + np.sin(self.x/self.L))
+                else:
+                    # random noise, independent for each trajectory
+                    u0 = (np.random.rand(self.B, self.N) -0.5)*0.01
+            elif (np.shape(u0)[-1] != self.N):
+                print('Error: wrong IC array size')
+                return -1
+            u0 = self.xp.asarray(np.broadcast_to(u0, (self.B, self.N)))
+            v0 = self._fft.rfft(u0, axis=-1)
+        else:
+            if (np.shape(v0)[-1] != self.Nf):
+                print('Error: wrong IC array size')
+                return -1
+            v0 = self.xp.asarray(np.broadcast_to(v0, (self.B, self.Nf)))
+            u0 = self._fft.irfft(v0, n=self.N, axis=-1)
+        #
+        # and save to self
+        self.u0  = u0
+        self.v0  = v0
+        self.v   = v0.astype(np.complex64) # own copy, step works in place
+        self.t   = 0.
+        self.stepnum = 0
+        self.ioutnum = 0 # [0] is the initial condition
 
 
+    def simulate(self, nsteps=None, iout=None, restart=False, correction=[]):
+        #
+        # As KS.simulate; a correction given on the host, shape (Nf,) or
+        # (B, Nf), is moved to the array module first (CuPy refuses implicit
+        # host-to-device conversion in v += correction)
+        if (np.size(correction) > 0):
+            correction = self.xp.asarray(correction, dtype=self.v.dtype)
+        return KS.simulate(self, nsteps=nsteps, iout=iout, restart=restart, correction=correction)
+
 
+    def nonlinear(self, x, out):
+        #
+        # Nonlinear term for the whole batch, one transform along the last axis
+        ui = self._fft.irfft(x, n=self.N, axis=-1)
+        self.xp.square(ui, out=ui)
+        self.xp.multiply(self.g, self._fft.rfft(ui, axis=-1, overwrite_x=True), out=out)
+
+
+    def fou2real(self):
+        #
+        # Convert from spectral to physical space, the result is on the host
+        uu = self._fft.irfft(self.vv, n=self.N, axis=-1)
+        self.uu = uu if (self.xp is np) else self.xp.asnumpy(uu)